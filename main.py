@@ -1,12 +1,22 @@
 import os
 import time
-import json
+import itertools
+import secrets
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import orjson
 import logging
+from dataclasses import dataclass
+from typing import Optional
 from dotenv import load_dotenv
-from apscheduler.schedulers.background import BackgroundScheduler
-import telebot
-from telebot.types import Message
+from datetime import datetime, timedelta
+from aiohttp import web
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from telebot import asyncio_helper
+from telebot.async_telebot import AsyncTeleBot
+from telebot.types import Message, Update
 from quiz_handler import parse_quiz_text, Question
+from rate_limiter import RateLimiter
 
 # --- Setup logging
 logging.basicConfig(level=logging.INFO)
@@ -20,222 +30,351 @@ QUIZ_GROUP_ID = int(os.getenv('QUIZ_GROUP_ID') or 0)
 STORAGE_GROUP_ID = int(os.getenv('STORAGE_GROUP_ID') or 0)
 DEFAULT_NEGATIVE = float(os.getenv('DEFAULT_NEGATIVE') or 1/3)
 DEFAULT_TIMER = int(os.getenv('DEFAULT_TIMER') or 30)
+# Public base URL for webhook mode (Render sets RENDER_EXTERNAL_URL); long-polling is used when unset
+WEBHOOK_URL = (os.getenv('WEBHOOK_URL') or os.getenv('RENDER_EXTERNAL_URL') or '').rstrip('/')
+PORT = int(os.getenv('PORT') or 8080)
+WEBHOOK_PATH = '/webhook'
+# Telegram echoes this in X-Telegram-Bot-Api-Secret-Token; a fresh one is registered at each start if unset
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET') or secrets.token_urlsafe(32)
 
 if not BOT_TOKEN or not ADMIN_ID or not QUIZ_GROUP_ID or not STORAGE_GROUP_ID:
     logger.error('Missing required .env settings. Please fill BOT_TOKEN, ADMIN_ID, QUIZ_GROUP_ID and STORAGE_GROUP_ID')
     raise SystemExit('Incomplete .env')
 
-bot = telebot.TeleBot(BOT_TOKEN, parse_mode=None)
+# Every API call shares one aiohttp session; TELEGRAM_POOL_SIZE overrides its
+# connection limit (telebot's default is 50)
+if os.getenv('TELEGRAM_POOL_SIZE'):
+    asyncio_helper.REQUEST_LIMIT = int(os.getenv('TELEGRAM_POOL_SIZE'))
+bot = AsyncTeleBot(BOT_TOKEN, parse_mode=None)
+# Paces quiz traffic under Telegram's 30 msg/s global and ~1 msg/s per-chat limits;
+# closing and deleting polls only counts against the global limit
+rate_limiter = RateLimiter(global_rate=30, per_chat_rate=1)
 
 # In-memory state for running/scheduled quizzes
 SCHEDULED_QUIZZES = {}  # job_id -> {"questions": [...], "original_msg": Message, ...}
-ACTIVE_POLLS = {}  # poll_id -> {chat_id, message_id, question_index, correct_option, participants_answers}
+ACTIVE_POLLS = {}  # poll_id -> {chat_id, message_id, question_index, correct_option, answered}
 
 DATA_DIR = 'data'
 os.makedirs(DATA_DIR, exist_ok=True)
 SCORES_FILE = os.path.join(DATA_DIR, 'scores.json')
+SCORES_FLUSH_INTERVAL = 10  # seconds
+SCORES_WRITE_BUFFER = 1 << 16
 
 # ensure scores file
 if not os.path.exists(SCORES_FILE):
-    with open(SCORES_FILE, 'w') as f:
-        json.dump({}, f)
+    with open(SCORES_FILE, 'wb') as f:
+        f.write(orjson.dumps({}))
 
-scheduler = BackgroundScheduler()
-scheduler.start()
+# Jobs are coroutines run on the bot's event loop; started in main().
+# coalesce collapses a backlog of missed interval runs (e.g. flushes) into one
+scheduler = AsyncIOScheduler(job_defaults={'misfire_grace_time': 30, 'coalesce': True})
 
 # --- Utilities for scores
 
 def load_scores():
     try:
-        with open(SCORES_FILE, 'r') as f:
-            return json.load(f)
+        with open(SCORES_FILE, 'rb') as f:
+            return orjson.loads(f.read())
     except Exception:
         return {}
 
 
-def save_scores(scores):
-    with open(SCORES_FILE, 'w') as f:
-        json.dump(scores, f, indent=2)
+def save_scores(data: bytes):
+    # write to a temp file and swap it in so a crash never leaves a half-written file
+    tmp_path = SCORES_FILE + '.tmp'
+    with open(tmp_path, 'wb', buffering=SCORES_WRITE_BUFFER) as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, SCORES_FILE)
+
+
+# Scores live in memory and are flushed to disk periodically and at quiz end
+SCORES = load_scores()
+SCORES_DIRTY = False
+# Single dedicated writer thread: flushes never overlap on the temp file and
+# never compete with other blocking work for the loop's default executor
+SCORES_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='scores-flush')
+# Held for a whole flush so periodic and end-of-quiz flushes run strictly one after another
+SCORES_FLUSH_LOCK = asyncio.Lock()
+
+
+async def flush_scores():
+    global SCORES_DIRTY
+    async with SCORES_FLUSH_LOCK:
+        if not SCORES_DIRTY:
+            return
+        SCORES_DIRTY = False
+        # serialize on the loop, where SCORES is mutated, so the bytes are a consistent
+        # snapshot without copying the dict; only the disk write goes to the writer thread
+        try:
+            data = orjson.dumps(SCORES)
+            await asyncio.get_running_loop().run_in_executor(SCORES_WRITER, save_scores, data)
+        except Exception:
+            SCORES_DIRTY = True
+            logger.exception('Failed to save scores')
+
+
+scheduler.add_job(flush_scores, 'interval', seconds=SCORES_FLUSH_INTERVAL, id='flush_scores')
 
 
 # --- Admin-only decorator
 def admin_only(func):
-    def wrapper(message: Message):
-        from telebot import types
+    async def wrapper(message: Message):
         user_id = message.from_user.id if message.from_user else None
         if user_id != ADMIN_ID:
-            bot.reply_to(message, "❌ You are not authorized to use this bot.")
+            await bot.reply_to(message, "❌ You are not authorized to use this bot.")
             return
-        return func(message)
+        return await func(message)
     return wrapper
 
 
 # --- Command: /start (admin only)
 @bot.message_handler(commands=['start'])
 @admin_only
-def start_cmd(message: Message):
-    bot.reply_to(message, "Strivane Quiz Bot is online. Send a .txt file or paste quiz text to schedule. Use /schedule YYYY-MM-DD HH:MM to schedule the last uploaded quiz.")
+async def start_cmd(message: Message):
+    await bot.reply_to(message, "Strivane Quiz Bot is online. Send a .txt file or paste quiz text to schedule. Use /schedule YYYY-MM-DD HH:MM to schedule the last uploaded quiz.")
+
+
+# Suffix keeping quiz job ids unique when two schedules land in the same second
+_QUIZ_SEQ = itertools.count(1)
+
 
+# Hold the last uploaded quiz per admin, keyed by user id
+@dataclass
+class QuizDraft:
+    message: Message
+    text: str
+    file_id: Optional[str] = None
 
-# Hold the last uploaded quiz per admin session
-LAST_QUIZ_STORAGE = {
-    'message': None,
-    'text': None,
-    'file_id': None,
-}
+
+LAST_QUIZ_STORAGE = {}  # user_id -> QuizDraft
 
 
 # --- Receive .txt file upload (admin only)
 @bot.message_handler(content_types=['document'])
 @admin_only
-def handle_document(message: Message):
+async def handle_document(message: Message):
     doc = message.document
     if not doc.file_name.lower().endswith('.txt'):
-        bot.reply_to(message, 'Please upload a .txt file containing the quiz in the proper format.')
+        await bot.reply_to(message, 'Please upload a .txt file containing the quiz in the proper format.')
         return
-    file_info = bot.get_file(doc.file_id)
-    file_bytes = bot.download_file(file_info.file_path)
+    file_info = await bot.get_file(doc.file_id)
+    file_bytes = await bot.download_file(file_info.file_path)
     text = file_bytes.decode('utf-8')
-    LAST_QUIZ_STORAGE['message'] = message
-    LAST_QUIZ_STORAGE['text'] = text
-    LAST_QUIZ_STORAGE['file_id'] = doc.file_id
-    bot.reply_to(message, f'✅ Quiz file received. Use /schedule YYYY-MM-DD HH:MM to schedule it in the group {QUIZ_GROUP_ID}.')
+    LAST_QUIZ_STORAGE[message.from_user.id] = QuizDraft(message=message, text=text, file_id=doc.file_id)
+    await bot.reply_to(message, f'✅ Quiz file received. Use /schedule YYYY-MM-DD HH:MM to schedule it in the group {QUIZ_GROUP_ID}.')
 
 
 # --- Receive pasted text (admin only)
 @bot.message_handler(func=lambda m: m.content_type == 'text')
 @admin_only
-def handle_text(message: Message):
+async def handle_text(message: Message):
     text = message.text.strip()
     # If this is a schedule command, handle below
     if text.lower().startswith('/schedule'):
         # pass to schedule handler
-        schedule_command(message)
+        await schedule_command(message)
         return
 
     # Otherwise treat as quiz text
-    LAST_QUIZ_STORAGE['message'] = message
-    LAST_QUIZ_STORAGE['text'] = text
-    LAST_QUIZ_STORAGE['file_id'] = None
-    bot.reply_to(message, '✅ Quiz text received. Use /schedule YYYY-MM-DD HH:MM to schedule it.')
+    LAST_QUIZ_STORAGE[message.from_user.id] = QuizDraft(message=message, text=text)
+    await bot.reply_to(message, '✅ Quiz text received. Use /schedule YYYY-MM-DD HH:MM to schedule it.')
 
 
 # --- Schedule command (admin only)
 @admin_only
-def schedule_command(message: Message):
+async def schedule_command(message: Message):
     text = message.text.strip()
     parts = text.split()
     if len(parts) < 3:
-        bot.reply_to(message, 'Usage: /schedule YYYY-MM-DD HH:MM')
+        await bot.reply_to(message, 'Usage: /schedule YYYY-MM-DD HH:MM')
         return
     try:
         date = parts[1]
         timepart = parts[2]
-        from datetime import datetime
         dt = datetime.strptime(f"{date} {timepart}", "%Y-%m-%d %H:%M")
     except Exception as e:
-        bot.reply_to(message, 'Invalid datetime format. Use /schedule YYYY-MM-DD HH:MM')
+        await bot.reply_to(message, 'Invalid datetime format. Use /schedule YYYY-MM-DD HH:MM')
         return
 
-    if not LAST_QUIZ_STORAGE['text']:
-        bot.reply_to(message, 'No quiz uploaded yet. Please upload a .txt file or paste quiz text first.')
+    draft = LAST_QUIZ_STORAGE.get(message.from_user.id)
+    if not draft or not draft.text:
+        await bot.reply_to(message, 'No quiz uploaded yet. Please upload a .txt file or paste quiz text first.')
         return
 
     # parse quiz
-    questions = parse_quiz_text(LAST_QUIZ_STORAGE['text'], default_negative=DEFAULT_NEGATIVE, default_time=DEFAULT_TIMER)
+    questions = parse_quiz_text(draft.text, default_negative=DEFAULT_NEGATIVE, default_time=DEFAULT_TIMER)
     if not questions:
-        bot.reply_to(message, 'Failed to parse quiz. Please check format.')
+        await bot.reply_to(message, 'Failed to parse quiz. Please check format.')
         return
 
-    job_id = f"quiz_{int(time.time())}"
-
-    def job_func(qs=questions, orig_msg=LAST_QUIZ_STORAGE['message'], jid=job_id):
-        try:
-            run_quiz_job(jid, qs, orig_msg)
-        except Exception as ex:
-            logger.exception('Error running scheduled quiz: %s', ex)
+    job_id = f"quiz_{int(time.time())}_{next(_QUIZ_SEQ)}"
 
-    scheduler.add_job(job_func, 'date', run_date=dt, id=job_id)
-    SCHEDULED_QUIZZES[job_id] = {'questions': questions, 'original_msg': LAST_QUIZ_STORAGE['message']}
-    bot.reply_to(message, f'✅ Quiz scheduled for {dt.strftime("%Y-%m-%d %H:%M")}. Job id: {job_id}')
+    # a time in the current minute is already (partly) past: start now so no job falls
+    # outside misfire_grace_time; anything earlier is most likely a typo
+    now = datetime.now()
+    if dt < now.replace(second=0, microsecond=0):
+        await bot.reply_to(message, 'That time is in the past. Use /schedule YYYY-MM-DD HH:MM with a current or future time.')
+        return
+    start = max(dt, now)
+    try:
+        schedule_quiz_jobs(job_id, questions, draft.message, start)
+    except Exception as ex:
+        logger.exception('Error scheduling quiz: %s', ex)
+        await bot.reply_to(message, 'Failed to schedule quiz.')
+        return
+    await bot.reply_to(message, f'✅ Quiz scheduled for {start.strftime("%Y-%m-%d %H:%M:%S")}. Job id: {job_id}')
 
 
 # Attach the schedule command to the /schedule handler so admin can use it
 @bot.message_handler(commands=['schedule'])
 @admin_only
-def schedule_cmd_entry(message: Message):
-    schedule_command(message)
+async def schedule_cmd_entry(message: Message):
+    await schedule_command(message)
+
+
+# --- Core: a quiz is a chain of date jobs (post/close per question, then cleanup), nothing blocks
+# Delay between closing the last poll and cleaning up the group
+CLEANUP_GRACE = 2
+# Telegram's deleteMessages/forwardMessages accept at most 100 ids per call
+MESSAGE_BATCH_SIZE = 100
+
+
+def _batches(message_ids: list):
+    for i in range(0, len(message_ids), MESSAGE_BATCH_SIZE):
+        yield message_ids[i:i + MESSAGE_BATCH_SIZE]
 
 
-# --- Core: run the quiz job (posts polls one by one)
-def run_quiz_job(job_id: str, questions: list, orig_msg: Message):
-    logger.info('Starting quiz job %s with %d questions', job_id, len(questions))
-    posted_messages = []  # list of (chat_id, message_id)
+def schedule_quiz_jobs(job_id: str, questions: list, orig_msg: Message, start: datetime):
+    logger.info('Scheduling quiz job %s with %d questions at %s', job_id, len(questions), start)
+    added = []
 
+    def add(func, run_date, args, suffix):
+        added.append(scheduler.add_job(func, 'date', run_date=run_date, args=args, id=f'{job_id}_{suffix}').id)
+
+    # every post/close fires at start + cumulative question time
+    try:
+        offset = 0
+        for idx, q in enumerate(questions):
+            post_at = start + timedelta(seconds=offset)
+            offset += q.time
+            close_at = start + timedelta(seconds=offset)
+            add(post_question, post_at, (job_id, idx, close_at), f'post_{idx}')
+            add(close_question, close_at, (job_id, idx), f'close_{idx}')
+        add(finish_quiz_job, start + timedelta(seconds=offset + CLEANUP_GRACE), (job_id, orig_msg), 'finish')
+    except Exception:
+        # leave nothing half-scheduled behind
+        for added_id in added:
+            try:
+                scheduler.remove_job(added_id)
+            except Exception:
+                pass
+        raise
+
+    # jobs only run once control returns to the loop, so the state is in place before any fires
+    SCHEDULED_QUIZZES[job_id] = {
+        'questions': questions,
+        'original_msg': orig_msg,
+        'posted_messages': {},  # question index -> (chat_id, message_id, poll_id)
+    }
+
+
+async def post_question(job_id: str, idx: int, close_at: datetime):
+    state = SCHEDULED_QUIZZES.get(job_id)
+    if not state:
+        return
+    q = state['questions'][idx]
     chat_id = QUIZ_GROUP_ID
+    if idx == 0:
+        logger.info('Starting quiz job %s with %d questions', job_id, len(state['questions']))
 
-    for idx, q in enumerate(questions):
-        # send poll
-        try:
-            msg = bot.send_poll(chat_id, q.text, q.options, type='quiz', is_anonymous=False, correct_option_id=q.correct_option)
-        except Exception as e:
-            logger.exception('Failed to send poll: %s', e)
-            continue
-
-        poll = msg.poll
-        poll_id = poll.id
-        posted_messages.append((chat_id, msg.message_id))
-
-        # register active poll
-        ACTIVE_POLLS[poll_id] = {
-            'chat_id': chat_id,
-            'message_id': msg.message_id,
-            'question_index': idx,
-            'correct_option': q.correct_option,
-            'negative': q.negative,
-            'answers': {},  # user_id -> selected_option_index
-        }
-
-        # wait for the question time
-        logger.info('Question %d posted (poll_id=%s). Waiting %d seconds', idx + 1, poll_id, q.time)
-        time.sleep(q.time)
-
-        # close poll
+    # send poll
+    try:
+        msg = await rate_limiter.call(chat_id, bot.send_poll, chat_id, q.text, q.options, type='quiz', is_anonymous=False, correct_option_id=q.correct_option)
+    except Exception as e:
+        logger.exception('Failed to send poll: %s', e)
+        return
+
+    # rate limiting or 429 retries can delay the send past this question's close job
+    # (or the whole quiz's cleanup); such a poll would never be closed or deleted
+    if job_id not in SCHEDULED_QUIZZES or datetime.now() >= close_at:
+        logger.warning('Question %d of %s was posted after its close time; removing it', idx + 1, job_id)
         try:
-            bot.stop_poll(chat_id, msg.message_id)
+            await rate_limiter.call(None, bot.delete_message, chat_id, msg.message_id)
         except Exception:
-            logger.exception('Failed to stop poll for message %s', msg.message_id)
+            logger.exception('Failed to delete late poll message %s', msg.message_id)
+        return
 
-        # compute intermediate scoring for this question based on ACTIVE_POLLS[poll_id]['answers']
-        compute_scores_for_poll(poll_id)
+    poll_id = msg.poll.id
+    state['posted_messages'][idx] = (chat_id, msg.message_id, poll_id)
+
+    # register active poll
+    ACTIVE_POLLS[poll_id] = {
+        'chat_id': chat_id,
+        'message_id': msg.message_id,
+        'question_index': idx,
+        'correct_option': q.correct_option,
+        'negative': q.negative,
+        'answered': set(),  # ids of users who already answered (and were scored)
+    }
+    logger.info('Question %d posted (poll_id=%s). Closing in %d seconds', idx + 1, poll_id, q.time)
 
-    # Quiz finished — delete posted messages from group
-    logger.info('Quiz job %s finished. Deleting quiz messages from group.', job_id)
-    for c, mid in posted_messages:
-        try:
-            bot.delete_message(c, mid)
-        except Exception:
-            logger.exception('Failed to delete message %s in chat %s', mid, c)
 
-    # Forward the original quiz message (file or text message) to storage group
+async def close_question(job_id: str, idx: int):
+    state = SCHEDULED_QUIZZES.get(job_id)
+    if not state or idx not in state['posted_messages']:
+        return
+    chat_id, message_id, poll_id = state['posted_messages'][idx]
+
+    # close poll
     try:
-        orig = SCHEDULED_QUIZZES.get(job_id, {}).get('original_msg') or orig_msg
-        if orig is not None:
-            # forward the message
-            bot.forward_message(STORAGE_GROUP_ID, orig.chat.id, orig.message_id)
+        await rate_limiter.call(None, bot.stop_poll, chat_id, message_id)
     except Exception:
-        logger.exception('Failed to forward original quiz message to storage group')
+        logger.exception('Failed to stop poll for message %s', message_id)
+
+    # stop accepting answers for this question
+    compute_scores_for_poll(poll_id)
+
+
+async def finish_quiz_job(job_id: str, orig_msg: Message):
+    state = SCHEDULED_QUIZZES.get(job_id, {})
+    posted_by_chat = {}  # chat_id -> [message_id, ...]
+    for c, mid, _ in state.get('posted_messages', {}).values():
+        posted_by_chat.setdefault(c, []).append(mid)
+
+    # Quiz finished — delete posted messages from group, up to 100 per deleteMessages call
+    logger.info('Quiz job %s finished. Deleting quiz messages from group.', job_id)
+    for c, mids in posted_by_chat.items():
+        for batch in _batches(mids):
+            try:
+                await rate_limiter.call(None, bot.delete_messages, c, batch)
+            except Exception:
+                logger.exception('Failed to delete messages %s in chat %s', batch, c)
+
+    # Forward the original quiz message (file or text message) to storage group,
+    # up to 100 messages per forwardMessages call for each source chat
+    to_archive = {}  # source chat_id -> [message_id, ...]
+    orig = state.get('original_msg') or orig_msg
+    if orig is not None:
+        to_archive.setdefault(orig.chat.id, []).append(orig.message_id)
+    for c, mids in to_archive.items():
+        for batch in _batches(sorted(mids)):
+            try:
+                await rate_limiter.call(STORAGE_GROUP_ID, bot.forward_messages, STORAGE_GROUP_ID, c, batch)
+            except Exception:
+                logger.exception('Failed to forward quiz messages %s to storage group', batch)
 
     # Cleanup
-    if job_id in SCHEDULED_QUIZZES:
-        del SCHEDULED_QUIZZES[job_id]
+    SCHEDULED_QUIZZES.pop(job_id, None)
+    await flush_scores()
 
     logger.info('Quiz job %s complete and archived.', job_id)
 
 
-# --- Poll answer handler to record each user's answer
+# --- Poll answer handler: record each user's answer and score it immediately
 @bot.poll_answer_handler(func=lambda a: True)
-def handle_poll_answer(poll_answer):
+async def handle_poll_answer(poll_answer):
     try:
         poll_id = poll_answer.poll_id
         user = poll_answer.user
@@ -243,16 +382,22 @@ def handle_poll_answer(poll_answer):
         if not option_ids:
             return
         selected = option_ids[0]
-        if poll_id in ACTIVE_POLLS:
-            ACTIVE_POLLS[poll_id]['answers'][user.id] = selected
-            logger.debug('Recorded answer: user=%s poll=%s option=%s', user.id, poll_id, selected)
+        # handlers and jobs all run on the one event loop, and nothing below awaits,
+        # so the check-and-record is atomic without a lock
+        info = ACTIVE_POLLS.get(poll_id)
+        # quiz answers are final, so a repeat update for the same user is ignored
+        if info is None or user.id in info['answered']:
+            return
+        info['answered'].add(user.id)
+        record_answer(user.id, _display_name(user), selected, info['correct_option'], info.get('negative', DEFAULT_NEGATIVE))
+        logger.debug('Recorded answer: user=%s poll=%s option=%s', user.id, poll_id, selected)
     except Exception:
         logger.exception('Error in poll_answer handler')
 
 
-# --- Poll update handler (detect closed polls) to finalize scoring if needed
+# --- Poll update handler (detect closed polls) to finalize the poll if needed
 @bot.poll_handler(func=lambda p: True)
-def handle_poll_update(poll):
+async def handle_poll_update(poll):
     try:
         # When Telegram closes poll it sends a poll update with is_closed True
         if poll.is_closed and poll.id in ACTIVE_POLLS:
@@ -263,53 +408,82 @@ def handle_poll_update(poll):
 
 # --- Score computation
 
-def compute_scores_for_poll(poll_id: str):
-    info = ACTIVE_POLLS.get(poll_id)
-    if not info:
-        return
-    correct = info['correct_option']
-    negative = info.get('negative', DEFAULT_NEGATIVE)
-    answers = info.get('answers', {})
-
-    scores = load_scores()
-    for user_id_str, selected_option in list(answers.items()):
-        # user_id here is int (from poll_answer), convert to string for JSON
-        uid = str(user_id_str)
-        uid_int = int(user_id_str)
-        if uid not in scores:
-            scores[uid] = {
-                'username': None,
-                'attempted': 0,
-                'correct': 0,
-                'wrong': 0,
-                'score': 0.0,
-            }
-        user_entry = scores[uid]
-        user_entry['attempted'] += 1
-        if selected_option == correct:
-            user_entry['correct'] += 1
-            user_entry['score'] += 1.0
-        else:
-            user_entry['wrong'] += 1
-            user_entry['score'] -= negative
+def _new_entry():
+    return {
+        'username': None,
+        'attempted': 0,
+        'correct': 0,
+        'wrong': 0,
+        'score': 0.0,
+    }
 
-        # try to update username if available via get_chat
-        try:
-            u = bot.get_chat(uid_int)
-            user_entry['username'] = u.username or f"{u.first_name or ''} {u.last_name or ''}".strip()
-        except Exception:
-            pass
 
-    save_scores(scores)
+def _display_name(u):
+    return u.username or f"{u.first_name or ''} {u.last_name or ''}".strip()
+
 
-    # once processed, remove poll from active polls to avoid double processing
+def record_answer(user_id: int, username: str, selected_option: int, correct: int, negative: float):
+    global SCORES_DIRTY
+    # user id is an int from poll_answer, stored as a string for JSON
+    user_entry = SCORES.setdefault(str(user_id), _new_entry())
+    user_entry['username'] = username
+    user_entry['attempted'] += 1
+    if selected_option == correct:
+        user_entry['correct'] += 1
+        user_entry['score'] += 1.0
+    else:
+        user_entry['wrong'] += 1
+        user_entry['score'] -= negative
+    SCORES_DIRTY = True
+
+
+def compute_scores_for_poll(poll_id: str):
+    # answers are scored as they arrive; closing a poll only stops accepting them
+    ACTIVE_POLLS.pop(poll_id, None)
+
+
+# --- Webhook endpoint: Telegram pushes updates here instead of being polled
+async def handle_webhook(request: web.Request):
+    if not secrets.compare_digest(request.headers.get('X-Telegram-Bot-Api-Secret-Token', ''), WEBHOOK_SECRET):
+        return web.Response(status=403)
+    update = Update.de_json(await request.text())
+    await bot.process_new_updates([update])
+    return web.Response()
+
+
+async def run_webhook():
+    app = web.Application()
+    app.router.add_post(WEBHOOK_PATH, handle_webhook)
+    # no access log: request lines would otherwise go to the service logs on every update
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', PORT).start()
     try:
-        del ACTIVE_POLLS[poll_id]
-    except KeyError:
-        pass
+        await bot.remove_webhook()
+        await bot.set_webhook(url=WEBHOOK_URL + WEBHOOK_PATH, max_connections=40, secret_token=WEBHOOK_SECRET)
+        logger.info('Bot started. Receiving updates via webhook on port %d...', PORT)
+        await asyncio.Event().wait()
+    finally:
+        await runner.cleanup()
+
+
+# --- Run webhook server or polling loop
+async def main():
+    scheduler.start()
+    try:
+        if WEBHOOK_URL:
+            await run_webhook()
+        else:
+            # a webhook left registered by an earlier deploy makes getUpdates fail with 409
+            await bot.remove_webhook()
+            logger.info('Bot started. Listening for commands...')
+            await bot.infinity_polling()
+    finally:
+        await flush_scores()
+        # the shared session only exists once an API call has been made
+        if asyncio_helper.session_manager.session is not None:
+            await bot.close_session()
 
 
-# --- Run polling loop
 if __name__ == '__main__':
-    logger.info('Bot started. Listening for commands...')
-    bot.infinity_polling()
+    asyncio.run(main())
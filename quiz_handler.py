@@ -1,20 +1,12 @@
-import re
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import List, Optional
 
 # Data structures and parsing logic for quiz .txt files
-QUESTION_BLOCK_RE = re.compile(r"""(?ms)
-\s*(\d+)\.\s*(?P<question>.*?)\n
-A\.\s*(?P<A>.*?)\n
-B\.\s*(?P<B>.*?)\n
-C\.\s*(?P<C>.*?)\n
-D\.\s*(?P<D>.*?)\n
-(?:Answer:\s*(?P<answer>\d+)\n)?
-(?:Negative:\s*(?P<negative>[-+0-9./]+)\n)?
-(?:Time:\s*(?P<time>\d+)\n)?
-""")
+OPTION_LETTERS = 'ABCD'
+META_PREFIXES = ('answer:', 'negative:', 'time:')
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Question:
     qid: int
     text: str
@@ -24,6 +16,7 @@ class Question:
     time: int
 
 
+@lru_cache(maxsize=256)
 def _parse_number_expr(expr: str) -> float:
     # supports fractions like 1/3
     expr = expr.strip()
@@ -46,73 +39,75 @@ def parse_quiz_text(text: str, default_negative: float = 1/3, default_time: int
     Answer: 3
     Negative: 0.25
     Time: 30
+
+    The text is scanned once, line by line. A numbered line (``N.``) always
+    starts a new question, as does any non-option line after a blank line;
+    blocks without a question and four options are dropped. The question
+    number and option letters are optional, and Answer/Negative/Time lines
+    fall back to the defaults when missing or malformed.
     """
     questions: List[Question] = []
+    current: Optional[dict] = None
 
-    # Normalize line endings
-    t = text.replace('\r\n', '\n')
+    def flush():
+        # only complete blocks (question + 4 options) become questions
+        if current is None or len(current['options']) < len(OPTION_LETTERS):
+            return
+        questions.append(Question(
+            qid=current['qid'] if current['qid'] is not None else len(questions) + 1,
+            text=current['text'],
+            options=current['options'],
+            correct_option=current['correct'],
+            negative=current['negative'],
+            time=current['time'],
+        ))
 
-    # Split into blocks by blank lines where a new question number appears
-    # We'll use the regex to find all blocks
-    for m in QUESTION_BLOCK_RE.finditer(t):
-        qid = int(m.group(1))
-        question_text = m.group('question').strip()
-        opts = [m.group('A').strip(), m.group('B').strip(), m.group('C').strip(), m.group('D').strip()]
-        ans = m.group('answer')
-        if ans is None:
-            # fallback: try to detect answer in-line like "Answer: C" or end with (C)
-            correct = 0
-        else:
-            correct = int(ans) - 1
-        neg = m.group('negative')
-        if neg is None:
-            negative = default_negative
-        else:
-            negative = _parse_number_expr(neg)
-        time_s = m.group('time')
-        if time_s is None:
-            time_v = default_time
-        else:
-            time_v = int(time_s)
+    after_blank = False
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line:
+            after_blank = True
+            continue
+
+        if current is not None and line.lower().startswith(META_PREFIXES):
+            key, _, value = line.partition(':')
+            key = key.lower()
+            try:
+                if key == 'answer':
+                    current['correct'] = int(value) - 1
+                elif key == 'negative':
+                    current['negative'] = _parse_number_expr(value)
+                else:
+                    current['time'] = int(value)
+            except (ValueError, ZeroDivisionError):
+                pass
+            after_blank = False
+            continue
 
-        questions.append(Question(qid=qid, text=question_text, options=opts, correct_option=correct, negative=negative, time=time_v))
+        num, dot, rest = line.partition('.')
+        # "2.5" or "3.14" is a decimal option, not a question number
+        numbered = bool(dot) and num.isdigit() and not rest[:1].isdigit()
+        is_option = False
+        if current is not None and len(current['options']) < len(OPTION_LETTERS):
+            letter = OPTION_LETTERS[len(current['options'])]
+            is_option = line.startswith((letter + '.', letter + ')'))
 
-    # If no matches by regex, try a simpler fallback parser (less strict) — split by double blank lines
-    if not questions:
-        blocks = [b.strip() for b in t.split('\n\n') if b.strip()]
-        qnum = 1
-        for b in blocks:
-            lines = [l.strip() for l in b.split('\n') if l.strip()]
-            if len(lines) >= 5:
-                # assume first line is question, next 4 are options
-                qtext = lines[0]
-                opts = [lines[1][2:].strip() if lines[1].startswith(('A.', 'A)')) else lines[1],
-                        lines[2][2:].strip() if lines[2].startswith(('B.', 'B)')) else lines[2],
-                        lines[3][2:].strip() if lines[3].startswith(('C.', 'C)')) else lines[3],
-                        lines[4][2:].strip() if lines[4].startswith(('D.', 'D)')) else lines[4]]
-                # try to find Answer: line
-                ans = None
-                neg = None
-                time_v = default_time
-                for line in lines[5:]:
-                    if line.lower().startswith('answer:'):
-                        try:
-                            ans = int(line.split(':', 1)[1].strip()) - 1
-                        except Exception:
-                            pass
-                    if line.lower().startswith('negative:'):
-                        try:
-                            neg = _parse_number_expr(line.split(':', 1)[1].strip())
-                        except Exception:
-                            pass
-                    if line.lower().startswith('time:'):
-                        try:
-                            time_v = int(line.split(':', 1)[1].strip())
-                        except Exception:
-                            pass
-                negative = neg if neg is not None else default_negative
-                correct = ans if ans is not None else 0
-                questions.append(Question(qid=qnum, text=qtext, options=opts, correct_option=correct, negative=negative, time=time_v))
-                qnum += 1
+        # a numbered line, a line after a complete block, or a non-option line after
+        # a blank line starts a new question; an unfinished block is dropped by flush()
+        if (current is None or numbered or len(current['options']) == len(OPTION_LETTERS)
+                or (after_blank and not is_option)):
+            flush()
+            current = {
+                'qid': int(num) if numbered else None,
+                'text': rest.strip() if numbered else line,
+                'options': [],
+                'correct': 0,
+                'negative': default_negative,
+                'time': default_time,
+            }
+        else:
+            current['options'].append(line[2:].strip() if is_option else line)
+        after_blank = False
 
+    flush()
     return questions
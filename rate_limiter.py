@@ -0,0 +1,61 @@
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from telebot.asyncio_helper import ApiTelegramException
+
+# Token-bucket pacing for outgoing Telegram calls (30 msg/s overall, ~1 msg/s per chat)
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        # all callers share one event loop, so check-and-take needs no lock
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class RateLimiter:
+    def __init__(self, global_rate: float = 30, per_chat_rate: float = 1, max_retries: int = 3):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        self.max_retries = max_retries
+
+    def _bucket_for(self, chat_id) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self.chat_buckets[chat_id] = TokenBucket(self.per_chat_rate)
+        return bucket
+
+    async def call(self, chat_id, func, *args, **kwargs):
+        """Await func(*args, **kwargs) once the buckets allow it, retrying after a 429.
+
+        Pass chat_id=None for calls that post nothing new to a chat (stop_poll,
+        delete_messages); those are charged to the global bucket only.
+        """
+        for attempt in range(self.max_retries + 1):
+            if chat_id is not None:
+                await self._bucket_for(chat_id).acquire()
+            await self.global_bucket.acquire()
+            try:
+                return await func(*args, **kwargs)
+            except ApiTelegramException as e:
+                if e.error_code != 429 or attempt == self.max_retries:
+                    raise
+                retry_after = (e.result_json or {}).get('parameters', {}).get('retry_after', 1)
+                logger.warning('Rate limited by Telegram in chat %s, retrying in %s seconds', chat_id, retry_after)
+                await asyncio.sleep(retry_after)
@@ -0,0 +1,71 @@
+from quiz_handler import Question, parse_quiz_text
+
+
+def test_numbered_quiz_with_meta():
+    text = (
+        "1. What is 2+2?\n"
+        "A. 1\n"
+        "B. 2\n"
+        "C. 3\n"
+        "D. 4\n"
+        "Answer: 4\n"
+        "Negative: 1/4\n"
+        "Time: 10\n"
+        "\n"
+        "2. Capital of France?\n"
+        "A. Rome\n"
+        "B. Paris\n"
+        "C. Berlin\n"
+        "D. Madrid\n"
+        "Answer: 2\n"
+    )
+    assert parse_quiz_text(text, default_negative=0.5, default_time=30) == [
+        Question(qid=1, text='What is 2+2?', options=['1', '2', '3', '4'], correct_option=3, negative=0.25, time=10),
+        Question(qid=2, text='Capital of France?', options=['Rome', 'Paris', 'Berlin', 'Madrid'],
+                 correct_option=1, negative=0.5, time=30),
+    ]
+
+
+def test_missing_and_malformed_meta_use_defaults():
+    text = "1. Q\r\nA. a\r\nB. b\r\nC. c\r\nD. d\r\nNegative: 1/0\r\nTime: soon\r\n"
+    [q] = parse_quiz_text(text, default_negative=0.25, default_time=20)
+    assert (q.correct_option, q.negative, q.time) == (0, 0.25, 20)
+
+
+def test_incomplete_block_is_dropped():
+    text = (
+        "1. Q1\nA. a\nB. b\nC. c\n"
+        "\n"
+        "2. Q2\nA. a\nB. b\nC. c\nD. d\nAnswer: 4\n"
+    )
+    [q] = parse_quiz_text(text)
+    assert (q.qid, q.text, q.options, q.correct_option) == (2, 'Q2', ['a', 'b', 'c', 'd'], 3)
+
+
+def test_incomplete_unnumbered_block_is_dropped_at_blank_line():
+    text = "Q1\na\nb\n\nQ2\nA) a\nB) b\nC) c\nD) d\n"
+    [q] = parse_quiz_text(text)
+    assert (q.qid, q.text, q.options) == (1, 'Q2', ['a', 'b', 'c', 'd'])
+
+
+def test_unnumbered_blocks_are_numbered_in_order():
+    text = (
+        "What?\nA) a\nB) b\nC) c\nD) d\nanswer: 2\nTIME: 5\n"
+        "\n"
+        "Next q\nw\nx\ny\nz\n"
+    )
+    first, second = parse_quiz_text(text)
+    assert (first.qid, first.text, first.correct_option, first.time) == (1, 'What?', 1, 5)
+    assert (second.qid, second.text, second.options) == (2, 'Next q', ['w', 'x', 'y', 'z'])
+
+
+def test_blank_lines_between_option_lines():
+    text = "1. Q\n\nA. a\n\nB. b\n\nC. c\n\nD. d\n\nAnswer: 3\n"
+    [q] = parse_quiz_text(text)
+    assert (q.options, q.correct_option) == (['a', 'b', 'c', 'd'], 2)
+
+
+def test_decimal_options_are_not_question_numbers():
+    text = "What is 5/2?\n2.5\n3.5\n1.5\n0.5\nAnswer: 1\n"
+    [q] = parse_quiz_text(text)
+    assert (q.qid, q.text, q.options, q.correct_option) == (1, 'What is 5/2?', ['2.5', '3.5', '1.5', '0.5'], 0)
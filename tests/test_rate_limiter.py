@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from telebot.asyncio_helper import ApiTelegramException
+
+import rate_limiter
+from rate_limiter import RateLimiter
+
+
+def _too_many_requests(retry_after):
+    return ApiTelegramException('sendPoll', None, {
+        'ok': False,
+        'error_code': 429,
+        'description': 'Too Many Requests',
+        'parameters': {'retry_after': retry_after},
+    })
+
+
+class FakeApiCall:
+    def __init__(self, failures):
+        self.failures = list(failures)
+        self.calls = 0
+
+    async def __call__(self, value):
+        self.calls += 1
+        if self.failures:
+            raise self.failures.pop(0)
+        return value
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    recorded = []
+    real_sleep = asyncio.sleep
+
+    async def fake_sleep(delay):
+        recorded.append(delay)
+        await real_sleep(0)
+
+    monkeypatch.setattr(rate_limiter.asyncio, 'sleep', fake_sleep)
+    return recorded
+
+
+def test_retries_after_429_using_retry_after(sleeps):
+    func = FakeApiCall([_too_many_requests(7)])
+    limiter = RateLimiter(global_rate=100, per_chat_rate=100)
+    assert asyncio.run(limiter.call(1, func, 'ok')) == 'ok'
+    assert func.calls == 2
+    assert 7 in sleeps
+
+
+def test_gives_up_after_max_retries(sleeps):
+    func = FakeApiCall([_too_many_requests(1) for _ in range(3)])
+    limiter = RateLimiter(global_rate=100, per_chat_rate=100, max_retries=2)
+    with pytest.raises(ApiTelegramException):
+        asyncio.run(limiter.call(1, func, 'ok'))
+    assert func.calls == 3
+
+
+def test_other_api_errors_are_not_retried(sleeps):
+    error = ApiTelegramException('sendPoll', None, {'ok': False, 'error_code': 400, 'description': 'Bad Request'})
+    func = FakeApiCall([error])
+    limiter = RateLimiter(global_rate=100, per_chat_rate=100)
+    with pytest.raises(ApiTelegramException):
+        asyncio.run(limiter.call(1, func, 'ok'))
+    assert func.calls == 1
+
+
+def test_global_only_calls_skip_per_chat_buckets():
+    limiter = RateLimiter(global_rate=100, per_chat_rate=1)
+
+    async def run():
+        await limiter.call(1, FakeApiCall([]), 'post')
+        # stop_poll right after a post in the same chat must not wait for the chat token
+        return await asyncio.wait_for(limiter.call(None, FakeApiCall([]), 'stop'), timeout=0.5)
+
+    assert asyncio.run(run()) == 'stop'
+    assert list(limiter.chat_buckets) == [1]